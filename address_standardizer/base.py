@@ -1,7 +1,13 @@
-from dataclasses import dataclass, field
+import json
+from dataclasses import dataclass, field, fields
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class RegionLevel(Enum):
     """Administrative division levels."""
@@ -12,7 +18,7 @@ class RegionLevel(Enum):
     VILLAGE = "村级"
 
 
-@dataclass
+@dataclass(slots=True)
 class Region:
     """Basic region model."""
     code: str
@@ -43,23 +49,20 @@ class Region:
         return level_map.get(self.level, 99)
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "code": self.code,
-            "name": self.name,
-            "level": self.level,
-            "parent_code": self.parent_code,
-            "parent_name": self.parent_name,
-            "full_path": self.full_path,
-            "pinyin": self.pinyin,
-            "pinyin_short": self.pinyin_short,
-            "short_name": self.short_name,
-            "alias": self.alias,
-            "lat": self.lat,
-            "lng": self.lng
-        }
+        return {name: getattr(self, name) for name in _REGION_FIELDS}
+
+    def to_json_bytes(self) -> bytes:
+        """Serialize to JSON bytes, via orjson when available."""
+        if orjson is not None:
+            return orjson.dumps(self.to_dict())
+        return json.dumps(self.to_dict(), ensure_ascii=False).encode("utf-8")
+
+
+# Cached once: avoids reflecting over dataclass fields on every to_dict call
+_REGION_FIELDS = tuple(f.name for f in fields(Region))
 
 
-@dataclass
+@dataclass(slots=True)
 class RegionWithHierarchy:
     """Region model with full hierarchy context."""
     current: Region
@@ -74,7 +77,7 @@ class RegionWithHierarchy:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class SearchResult:
     """Container for search results with scoring."""
     region: Region
@@ -1,9 +1,115 @@
+import os
 import time
 from collections import defaultdict
-from typing import Any, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
 
 from .storage import StorageManager
-from .utils import BitmapIndex
+from .utils import BitmapIndex, deletion_variants, derive_text_fields, pack_ngram
+
+
+# Must match the engine's max_edit_distance so the symmetric-delete index
+# covers the same neighborhood the fuzzy fallback promises.
+FUZZY_MAX_DELETES = 2
+
+
+def _inverted_partial(regions: List[Dict], offset: int) -> Dict[str, Dict[str, List[int]]]:
+    """Build inverted postings for one shard of regions (pure, process-safe).
+
+    Positions are global (offset by the shard start) so partial maps from all
+    workers merge by simple list concatenation.
+    """
+    name_inverted: Dict[str, List[int]] = defaultdict(list)
+    pinyin_inverted: Dict[str, List[int]] = defaultdict(list)
+    short_inverted: Dict[str, List[int]] = defaultdict(list)
+    level_inverted: Dict[str, List[int]] = defaultdict(list)
+    parent_inverted: Dict[str, List[int]] = defaultdict(list)
+
+    for local_idx, region in enumerate(regions):
+        idx = offset + local_idx
+        name = region["name"]
+        name_inverted[name.lower()].append(idx)
+        for char in name:
+            name_inverted[char].append(idx)
+
+        pinyin = region.get("pinyin")
+        if pinyin:
+            pinyin_lower = pinyin.lower()
+            pinyin_clean = pinyin_lower.replace(" ", "")
+            pinyin_inverted[pinyin_lower].append(idx)
+            pinyin_inverted[pinyin_clean].append(idx)
+            for char in pinyin_clean:
+                pinyin_inverted[char].append(idx)
+
+        short = region.get("pinyin_short")
+        if short:
+            short_lower = short.lower()
+            short_inverted[short_lower].append(idx)
+            for char in short_lower:
+                short_inverted[char].append(idx)
+
+        level_inverted[region["level"]].append(idx)
+
+        if region.get("parent_code"):
+            parent_inverted[region["parent_code"]].append(idx)
+
+    return {
+        "name_inverted": dict(name_inverted),
+        "pinyin_inverted": dict(pinyin_inverted),
+        "short_inverted": dict(short_inverted),
+        "level_inverted": dict(level_inverted),
+        "parent_inverted": dict(parent_inverted),
+    }
+
+
+def _ngram_postings(texts: List[str], ns=(2, 3)) -> Dict[str, Any]:
+    """Vectorized n-gram extraction over the whole corpus in a few numpy passes.
+
+    All texts are joined with a NUL separator and viewed as UTF-32 codepoints;
+    sliding windows are packed into uint64 keys (21 bits per codepoint, see
+    utils.pack_ngram) and grouped with a single lexsort, so the per-slice
+    Python loop disappears. Returns packed term key -> sorted, deduplicated
+    np.int32 posting array; keys stay packed ints, never decoded to strings.
+    """
+    postings: Dict[str, Any] = {}
+    if not texts:
+        return postings
+
+    joined = "\x00".join(texts)
+    codepoints = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+    lens = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    text_ids = np.repeat(np.arange(len(texts), dtype=np.int64), lens + 1)[:len(codepoints)]
+
+    for n in ns:
+        if len(codepoints) < n:
+            continue
+        windows = np.lib.stride_tricks.sliding_window_view(codepoints, n)
+        valid = (windows != 0).all(axis=1)  # drop windows crossing a separator
+        if not valid.any():
+            continue
+
+        packed = windows[valid].astype(np.uint64)
+        keys = packed[:, 0]
+        for j in range(1, n):
+            keys = (keys << np.uint64(21)) | packed[:, j]
+        ids = text_ids[:len(codepoints) - n + 1][valid]
+
+        order = np.lexsort((ids, keys))
+        keys = keys[order]
+        ids = ids[order].astype(np.int32)
+
+        keep = np.ones(len(keys), dtype=bool)
+        keep[1:] = (keys[1:] != keys[:-1]) | (ids[1:] != ids[:-1])
+        keys = keys[keep]
+        ids = ids[keep]
+
+        boundaries = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        for key, posting in zip(keys[boundaries], np.split(ids, boundaries[1:])):
+            postings[int(key)] = posting
+
+    return postings
 
 
 class RegionIndexBuilder:
@@ -22,29 +128,34 @@ class RegionIndexBuilder:
 
         # Main indices
         self.code_to_index = {}  # code -> array index
+        self.index_to_code = []  # array index -> code
         self.code_to_region = {}  # code -> region dict
+        self.derived_text = {}  # field name -> list of per-region lowercase variants
+
+        # Inverted indices (term -> list of dense int indices, see code_to_index)
+        self.name_inverted = defaultdict(list)
+        self.pinyin_inverted = defaultdict(list)
+        self.short_inverted = defaultdict(list)
+        self.level_inverted = defaultdict(list)
+        self.parent_inverted = defaultdict(list)
 
-        # Inverted indices
-        self.name_inverted = defaultdict(set)
-        self.pinyin_inverted = defaultdict(set)
-        self.short_inverted = defaultdict(set)
-        self.level_inverted = defaultdict(set)
-        self.parent_inverted = defaultdict(set)
+        # N-gram indices (term -> list of dense int indices)
+        self.name_ngrams = defaultdict(list)
+        self.pinyin_ngrams = defaultdict(list)
 
-        # Trie indices
-        self.name_trie = {}
-        self.pinyin_trie = {}
-        self.short_trie = {}
+        # Symmetric-delete fuzzy indices (deletion variant -> indices)
+        self.name_del_index = defaultdict(list)
+        self.pinyin_del_index = defaultdict(list)
 
-        # N-gram indices
-        self.name_ngrams = defaultdict(set)
-        self.pinyin_ngrams = defaultdict(set)
+        # (level, pinyin_short) -> region dicts, for pinyin-combo lookups
+        self.short_level_index = defaultdict(list)
 
         # Bitmap indices
         self.bitmap_indices = {}
 
         # Cache
         self.ancestor_cache = {}
+        self._index_structure = None
 
         self.stats = {
             "build_time": 0,
@@ -52,15 +163,20 @@ class RegionIndexBuilder:
             "index_counts": {}
         }
 
-    def build_all_indices(self) -> Dict[str, Any]:
-        """Execute the full building pipeline."""
+    def build_all_indices(self, parallel: bool = False, max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """Execute the full building pipeline.
+
+        With parallel=True the inverted-index stage is sharded across a
+        process pool; worthwhile for full-country datasets, not for small ones
+        (worker startup and region pickling dominate below ~100k regions).
+        """
         start_time = time.time()
 
         self._build_basic_indices()
-        self._build_inverted_indices()
-        self._build_trie_indices()
-        self._build_ngram_indices(n=2)
-        self._build_ngram_indices(n=3)
+        if parallel and self.region_count > 1:
+            self._build_text_indices_parallel(max_workers)
+        else:
+            self._build_text_indices()
         self._build_bitmap_indices()
         self._build_relation_indices()
 
@@ -73,103 +189,156 @@ class RegionIndexBuilder:
         for idx, region in enumerate(self.regions):
             code = region["code"]
             self.code_to_index[code] = idx
+            self.index_to_code.append(code)
             self.code_to_region[code] = region
+            if region.get("pinyin_short"):
+                self.short_level_index[(region["level"], region["pinyin_short"])].append(region)
+
+        # Derived text variants as parallel lists keyed by dense index, so
+        # the engine's scoring path never recomputes .lower()/suffix strips.
+        per_region = [derive_text_fields(r) for r in self.regions]
+        if per_region:
+            self.derived_text = {key: [d[key] for d in per_region] for key in per_region[0]}
+        else:
+            self.derived_text = {}
+
+    def _build_text_indices(self):
+        """Single pass over regions populating inverted and n-gram indices.
+
+        Fusing the passes avoids re-scanning self.regions per index family and
+        recomputing derived strings (lowercase, space-stripped pinyin) per pass.
+        Postings store dense int32 indices (see code_to_index), not code strings.
+        Prefix lookups are served by the engine's automaton, so no tries are
+        built or persisted.
+        """
+        name_inverted = self.name_inverted
+        pinyin_inverted = self.pinyin_inverted
+        short_inverted = self.short_inverted
 
-    def _build_inverted_indices(self):
-        for region in self.regions:
-            code = region["code"]
+        for idx, region in enumerate(self.regions):
+            name = region["name"]
 
-            # Full name and characters
-            name_lower = region["name"].lower()
-            self.name_inverted[name_lower].add(code)
-            for char in region["name"]:
-                self.name_inverted[char].add(code)
+            name_inverted[name.lower()].append(idx)
+            for char in name:
+                name_inverted[char].append(idx)
 
-            if region.get("pinyin"):
-                pinyin_lower = region["pinyin"].lower()
+            pinyin = region.get("pinyin")
+            if pinyin:
+                pinyin_lower = pinyin.lower()
                 pinyin_clean = pinyin_lower.replace(" ", "")
-                self.pinyin_inverted[pinyin_lower].add(code)
-                self.pinyin_inverted[pinyin_clean].add(code)
+                pinyin_inverted[pinyin_lower].append(idx)
+                pinyin_inverted[pinyin_clean].append(idx)
                 for char in pinyin_clean:
-                    self.pinyin_inverted[char].add(code)
+                    pinyin_inverted[char].append(idx)
 
-            if region.get("pinyin_short"):
-                short_lower = region["pinyin_short"].lower()
-                self.short_inverted[short_lower].add(code)
+            short = region.get("pinyin_short")
+            if short:
+                short_lower = short.lower()
+                short_inverted[short_lower].append(idx)
                 for char in short_lower:
-                    self.short_inverted[char].add(code)
+                    short_inverted[char].append(idx)
 
-            self.level_inverted[region["level"]].add(code)
+            self.level_inverted[region["level"]].append(idx)
 
             if region.get("parent_code"):
-                self.parent_inverted[region["parent_code"]].add(code)
+                self.parent_inverted[region["parent_code"]].append(idx)
 
-    def _build_trie_indices(self):
-        for region in self.regions:
-            code = region["code"]
-            self._add_to_trie(self.name_trie, region["name"], code)
+        self._build_deletion_maps()
+        self._build_ngram_maps()
 
-            if region.get("pinyin"):
-                pinyin = region["pinyin"].replace(" ", "")
-                self._add_to_trie(self.pinyin_trie, pinyin, code)
+    def _build_text_indices_parallel(self, max_workers: Optional[int] = None):
+        """Parallel variant: shard the inverted-index pass across processes.
 
-            if region.get("pinyin_short"):
-                self._add_to_trie(self.short_trie, region["pinyin_short"], code)
-
-    def _add_to_trie(self, trie: Dict, text: str, code: str):
-        node = trie
-        for char in text:
-            if char not in node:
-                node[char] = {"codes": set()}
-            node = node[char]
-            if "codes" not in node:
-                node["codes"] = set()
-            node["codes"].add(code)
-        node["$"] = True
+        N-grams and deletion maps are already single vectorized/serial passes.
+        """
+        workers = max_workers or os.cpu_count() or 1
+        shard = max(1, -(-self.region_count // workers))
+        shards = [self.regions[i:i + shard] for i in range(0, self.region_count, shard)]
+        offsets = list(range(0, self.region_count, shard))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(_inverted_partial, shards, offsets))
+
+        for partial in partials:
+            for field_name, mapping in partial.items():
+                target = getattr(self, field_name)
+                for key, posting in mapping.items():
+                    target[key].extend(posting)
+
+        self._build_deletion_maps()
+        self._build_ngram_maps()
+
+    def _build_deletion_maps(self):
+        """Symmetric-delete (SymSpell-style) fuzzy index.
+
+        Each name/pinyin is expanded into every string reachable by deleting
+        up to FUZZY_MAX_DELETES characters; the engine expands the query the
+        same way and intersects, turning fuzzy lookup into exact dict hits.
+        """
+        for idx, region in enumerate(self.regions):
+            for variant in deletion_variants(region["name"].lower(), FUZZY_MAX_DELETES):
+                self.name_del_index[variant].append(idx)
+
+            pinyin = region.get("pinyin")
+            if pinyin:
+                pinyin_clean = pinyin.lower().replace(" ", "")
+                for variant in deletion_variants(pinyin_clean, FUZZY_MAX_DELETES):
+                    self.pinyin_del_index[variant].append(idx)
+
+    def _build_ngram_maps(self):
+        # N-grams: one vectorized pass across the whole corpus
+        self.name_ngrams = _ngram_postings([r["name"] for r in self.regions])
+        self.pinyin_ngrams = _ngram_postings(
+            [r["pinyin"].replace(" ", "") if r.get("pinyin") else "" for r in self.regions])
 
     def _build_ngram_indices(self, n: int = 2):
-        for region in self.regions:
-            code = region["code"]
+        """Standalone n-gram pass; the main pipeline uses _build_text_indices."""
+        for idx, region in enumerate(self.regions):
             name = region["name"]
             for i in range(len(name) - n + 1):
-                self.name_ngrams[name[i:i + n]].add(code)
+                self.name_ngrams[pack_ngram(name[i:i + n])].append(idx)
 
             if region.get("pinyin"):
                 pinyin = region["pinyin"].replace(" ", "")
                 for i in range(len(pinyin) - n + 1):
-                    self.pinyin_ngrams[pinyin[i:i + n]].add(code)
+                    self.pinyin_ngrams[pack_ngram(pinyin[i:i + n])].append(idx)
 
     def _build_bitmap_indices(self):
-        for level, codes in self.level_inverted.items():
-            bitmap = BitmapIndex(self.region_count)
-            for code in codes:
-                bitmap.set(self.code_to_index[code])
-            self.bitmap_indices[f"level_{level}"] = bitmap
+        for level, idxs in self.level_inverted.items():
+            self.bitmap_indices[f"level_{level}"] = BitmapIndex.from_indices(self.region_count, idxs)
 
         # Common initials optimization
         common_initials = ["bj", "sh", "gz", "sz", "cd"]
         for initial in common_initials:
             if initial in self.short_inverted:
-                bitmap = BitmapIndex(self.region_count)
-                for code in self.short_inverted[initial]:
-                    bitmap.set(self.code_to_index[code])
-                self.bitmap_indices[f"initial_{initial}"] = bitmap
+                self.bitmap_indices[f"initial_{initial}"] = BitmapIndex.from_indices(
+                    self.region_count, self.short_inverted[initial])
 
     def _build_relation_indices(self):
         for region in self.regions:
-            code = region["code"]
-            self.ancestor_cache[code] = self._get_ancestors(code)
+            self._get_ancestors(region["code"])
 
     def _get_ancestors(self, code: str) -> List[str]:
-        ancestors = []
+        # Memoized via ancestor_cache: a region's chain is its parent's chain
+        # plus itself, so each chain is materialized at most once.
+        cached = self.ancestor_cache.get(code)
+        if cached is not None:
+            return cached
+
+        # Walk up until we hit a cached ancestor or the root, then unwind
+        chain = []
         current = code
-        while current in self.code_to_region:
-            region = self.code_to_region[current]
-            ancestors.insert(0, current)
-            current = region.get("parent_code")
+        while current in self.code_to_region and current not in self.ancestor_cache:
+            chain.append(current)
+            current = self.code_to_region[current].get("parent_code")
             if not current:
                 break
-        return ancestors
+
+        ancestors = list(self.ancestor_cache.get(current, [])) if current else []
+        for node in reversed(chain):
+            ancestors = ancestors + [node]
+            self.ancestor_cache[node] = ancestors
+        return self.ancestor_cache.get(code, [])
 
     def _calculate_stats(self):
         self.stats["index_counts"] = {
@@ -182,29 +351,35 @@ class RegionIndexBuilder:
         }
 
     def _get_index_structure(self) -> Dict[str, Any]:
-        def convert_sets(obj):
-            if isinstance(obj, set): return list(obj)
-            if isinstance(obj, dict): return {k: convert_sets(v) for k, v in obj.items()}
-            if isinstance(obj, list): return [convert_sets(item) for item in obj]
-            return obj
+        # Memoized: build_all_indices returns this and save_to_file reuses it,
+        # so the posting-conversion pass runs once, not once per consumer.
+        if self._index_structure is not None:
+            return self._index_structure
+
+        def to_postings(mapping: Dict) -> Dict[str, Any]:
+            # Deduplicate and sort each posting list into a compact int32 array
+            return {k: np.unique(np.asarray(v, dtype=np.int32)) for k, v in mapping.items()}
 
-        return {
+        self._index_structure = {
             "code_to_index": self.code_to_index,
+            "index_to_code": self.index_to_code,
             "code_to_region": self.code_to_region,
-            "name_inverted": convert_sets(self.name_inverted),
-            "pinyin_inverted": convert_sets(self.pinyin_inverted),
-            "short_inverted": convert_sets(self.short_inverted),
-            "level_inverted": convert_sets(self.level_inverted),
-            "parent_inverted": convert_sets(self.parent_inverted),
-            "name_trie": convert_sets(self.name_trie),
-            "pinyin_trie": convert_sets(self.pinyin_trie),
-            "short_trie": convert_sets(self.short_trie),
-            "name_ngrams": convert_sets(self.name_ngrams),
-            "pinyin_ngrams": convert_sets(self.pinyin_ngrams),
+            "derived_text": self.derived_text,
+            "name_inverted": to_postings(self.name_inverted),
+            "pinyin_inverted": to_postings(self.pinyin_inverted),
+            "short_inverted": to_postings(self.short_inverted),
+            "level_inverted": to_postings(self.level_inverted),
+            "parent_inverted": to_postings(self.parent_inverted),
+            "name_ngrams": to_postings(self.name_ngrams),
+            "pinyin_ngrams": to_postings(self.pinyin_ngrams),
+            "name_del_index": to_postings(self.name_del_index),
+            "pinyin_del_index": to_postings(self.pinyin_del_index),
+            "short_level_index": dict(self.short_level_index),
             "ancestor_cache": self.ancestor_cache,
             "bitmap_indices": self.bitmap_indices,  # BitmapIndex is serializable if pickle is used
             "stats": self.stats
         }
+        return self._index_structure
 
     def save_to_file(self, filepath: str):
         """Save the built index using StorageManager."""
@@ -212,4 +387,4 @@ class RegionIndexBuilder:
         StorageManager.save(filepath, index_data)
 
     def get_regions_by_level(self, level: str) -> List[Dict]:
-        return [self.code_to_region[code] for code in self.level_inverted.get(level, set())]
+        return [self.regions[idx] for idx in self.level_inverted.get(level, [])]
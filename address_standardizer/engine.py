@@ -1,16 +1,164 @@
 import logging
 import re
+from collections import defaultdict
 from difflib import SequenceMatcher
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Set, Union
 
+import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - pyahocorasick is a declared dependency
+    ahocorasick = None
+
+try:
+    import ahocorasick_rs
+except ImportError:
+    ahocorasick_rs = None
+
 from .base import Region, SearchResult
 from .storage import StorageManager
+from .utils import COMMON_SUFFIXES, LRUCache, deletion_variants, derive_text_fields, pack_ngram
+
+try:
+    from rapidfuzz import fuzz as _rf_fuzz, process as _rf_process
+except ImportError:  # pragma: no cover - rapidfuzz is a declared dependency
+    _rf_fuzz = _rf_process = None
+
+try:
+    import Levenshtein
+except ImportError:  # pragma: no cover - python-Levenshtein is a declared dependency
+    Levenshtein = None
 
 
 logger = logging.getLogger(__name__)
 
-COMMON_SUFFIXES = ["省", "市", "区", "县", "自治州", "自治区", "特别行政区"]
+LEVEL_RANKS = {"省级": 1, "市级": 2, "区县级": 3, "街道级": 4, "村级": 5}
+
+# Below this many candidates, per-candidate scoring beats numpy dispatch overhead
+_VECTORIZE_MIN = 16
+
+# Batch scoring relies on the np.strings module (NumPy >= 2.0, as declared);
+# guarded so an environment stuck on NumPy 1.x degrades to the scalar loop
+# instead of crashing mid-query
+_HAS_NP_STRINGS = hasattr(np, "strings")
+
+# Search-type detection runs on every auto-mode query; compiled regexes scan
+# in C instead of a per-char Python comparison loop
+_HAN_RE = re.compile(r"[一-鿿]")
+_ASCII_ALPHA_RE = re.compile(r"[a-z]")
+_PART_RE = re.compile(r"[一-鿿]+|[a-z]+")
+
+
+def _levenshtein_distance(s1: str, s2: str) -> int:
+    """Pure-Python Wagner-Fischer fallback for when Levenshtein is absent."""
+    if len(s1) < len(s2): return _levenshtein_distance(s2, s1)
+    if len(s2) == 0: return len(s1)
+    previous_row = range(len(s2) + 1)
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            insertions = previous_row[j + 1] + 1
+            deletions = current_row[j] + 1
+            substitutions = previous_row[j] + (c1 != c2)
+            current_row.append(min(insertions, deletions, substitutions))
+        previous_row = current_row
+    return previous_row[-1]
+
+
+def _edit_distance(s1: str, s2: str, max_distance: int) -> int:
+    """Bounded edit distance via the C extension when available."""
+    if Levenshtein is not None:
+        return Levenshtein.distance(s1, s2, score_cutoff=max_distance)
+    return _levenshtein_distance(s1, s2)
+
+
+def _charmask(text: str) -> int:
+    """256-bit mask over characters and 2-grams, for cheap overlap prefiltering."""
+    mask = 0
+    for char in text:
+        mask |= 1 << (ord(char) & 0xFF)
+    for i in range(len(text) - 1):
+        mask |= 1 << (hash(text[i:i + 2]) & 0xFF)
+    return mask
+
+
+def _score_candidate(query: str, name: str, short_name: str, pinyin: str,
+                     pinyin_short_ver: str, pinyin_short: str,
+                     full_path: str, clean_path: str, level_weight: float,
+                     boost_exact: float, boost_prefix: float) -> float:
+    """Scalar scoring core for one candidate.
+
+    Module-level with scalar-typed parameters (no attribute or dict access in
+    the loop body) so it stays compilable with mypyc or Cython as-is; mirrors
+    the branch structure of FuzzySearchAlgorithm._score_batch exactly.
+    """
+    # 1. Basic match score
+    score = 0.0
+    if query == name or query == short_name:
+        score += boost_exact
+    elif name.startswith(query) or short_name.startswith(query):
+        score += boost_prefix
+    elif query in name or query in short_name:
+        score += 0.5
+    elif name in query or short_name in query:
+        score += 0.4
+
+    if pinyin:
+        if query == pinyin or query == pinyin_short_ver:
+            score += boost_exact * 0.8
+        elif pinyin.startswith(query) or pinyin_short_ver.startswith(query):
+            score += boost_prefix * 0.6
+        elif query in pinyin or query in pinyin_short_ver:
+            score += 0.4
+        elif pinyin in query or pinyin_short_ver in query:
+            score += 0.3
+
+    if pinyin_short:
+        if query == pinyin_short:
+            score += 1.0
+        elif pinyin_short.startswith(query):
+            score += 0.8
+
+    # 2. Position weight
+    pos = name.find(query)
+    if pos != -1:
+        score += max(0.0, 1.0 - pos / len(name))
+    else:
+        pos = query.find(name)
+        if pos != -1:
+            score += max(0.0, 1.0 - pos / len(query))
+
+    # 3. Level weight
+    score *= level_weight
+
+    # 4. Full path reward (more lenient)
+    if full_path:
+        if query in full_path or query in clean_path:
+            path_factor = len(full_path.split(">")) / 3.0
+            score += 0.5 * path_factor  # Increased reward
+        else:
+            # Check if parts of query are in path
+            parts_found = 0
+            for part in _PART_RE.findall(query):
+                if part in full_path:
+                    parts_found += 1
+            if parts_found > 0:
+                score += 0.2 * parts_found
+
+    # 5. Pinyin similarity
+    if query.isalpha() and pinyin:
+        # Bit-parallel C ratio; SequenceMatcher is the last resort only
+        if _rf_fuzz is not None:
+            similarity = _rf_fuzz.ratio(query, pinyin) / 100.0
+        elif Levenshtein is not None:
+            similarity = Levenshtein.ratio(query, pinyin)
+        else:
+            similarity = SequenceMatcher(None, query, pinyin).ratio()
+        score += similarity * 0.3
+
+    return min(1.0, score)
 
 
 class FuzzySearchAlgorithm:
@@ -18,6 +166,18 @@ class FuzzySearchAlgorithm:
 
     def __init__(self, index_data: Dict[str, Any]):
         self.index = index_data
+        # Candidate sets are deduplicated on dense int positions (cheap int
+        # hashing) and resolved to code strings only for the survivors.
+        self._int_postings = "index_to_code" in index_data
+        self._code_to_index: Dict[str, int] = index_data.get("code_to_index", {})
+        self._index_to_code = index_data.get("index_to_code")
+        if self._index_to_code is None:
+            self._index_to_code = [""] * len(self._code_to_index)
+            for code, idx in self._code_to_index.items():
+                self._index_to_code[idx] = code
+        # Newer indices key n-gram postings by packed int (utils.pack_ngram)
+        name_ngrams = index_data.get("name_ngrams") or {}
+        self._packed_ngrams = bool(name_ngrams) and isinstance(next(iter(name_ngrams)), int)
         self.config = {
             "fuzzy_threshold": 0.7,
             "max_edit_distance": 2,
@@ -30,82 +190,319 @@ class FuzzySearchAlgorithm:
                 "区县级": 0.6
             }
         }
+        # Results are deterministic per loaded index, so repeated queries
+        # (autocomplete, batch normalization) hit the cache directly.
+        self._result_cache = LRUCache(maxsize=4096)
+        # Region objects are immutable per loaded index; memoized on first use
+        # rather than built eagerly for all regions at load time
+        self._region_cache: Dict[str, Region] = {}
+        self._build_derived_text()
+        self._build_level_arrays()
+        self._build_fuzzy_arrays()
+        self._build_keyword_automaton()
+
+    def _build_derived_text(self):
+        """Per-position lowercase/stripped variants (see utils.derive_text_fields).
+
+        Newer index files persist these; for older files they are derived once
+        here so the scoring hot path never pays for .lower(), suffix stripping
+        or path cleanup per candidate per query.
+        """
+        derived = self.index.get("derived_text")
+        if not derived:
+            per_region = [derive_text_fields(self.index["code_to_region"][code])
+                          for code in self._index_to_code]
+            derived = ({key: [d[key] for d in per_region] for key in per_region[0]}
+                       if per_region else {})
+        self._names_lc = derived.get("name_lc", [])
+        self._short_names_lc = derived.get("short_name_lc", [])
+        self._pinyins_lc = derived.get("pinyin_lc", [])
+        self._pinyin_short_vers_lc = derived.get("pinyin_short_ver_lc", [])
+        self._pinyin_shorts_lc = derived.get("pinyin_short_lc", [])
+        self._full_paths_lc = derived.get("full_path_lc", [])
+        self._clean_paths_lc = derived.get("clean_path_lc", [])
+
+        # Fixed-width unicode copies for np.strings batch scoring
+        def as_arr(values: List[str]):
+            return np.asarray(values, dtype=np.str_) if values else np.empty(0, dtype=np.str_)
+
+        self._names_arr = as_arr(self._names_lc)
+        self._short_names_arr = as_arr(self._short_names_lc)
+        self._pinyins_arr = as_arr(self._pinyins_lc)
+        self._pinyin_short_vers_arr = as_arr(self._pinyin_short_vers_lc)
+        self._pinyin_shorts_arr = as_arr(self._pinyin_shorts_lc)
+        self._full_paths_arr = as_arr(self._full_paths_lc)
+        self._clean_paths_arr = as_arr(self._clean_paths_lc)
+
+    def _build_level_arrays(self):
+        """Precompute per-position level rank and weight, avoiding dict lookups
+        (and rebuilt literal maps) in the scoring and ranking hot paths."""
+        count = len(self._index_to_code)
+        ranks = [99] * count
+        weights = [0.5] * count
+        level_weights = self.config["level_weights"]
+        for code, region in self.index["code_to_region"].items():
+            idx = self._code_to_index[code]
+            level = region["level"]
+            ranks[idx] = LEVEL_RANKS.get(level, 99)
+            weights[idx] = level_weights.get(level, 0.5)
+        self._level_rank_by_idx = np.asarray(ranks, dtype=np.int8)
+        self._level_weight_by_idx = np.asarray(weights, dtype=np.float32)
+
+    def _build_keyword_automaton(self):
+        """Bulk-build an Aho-Corasick automaton over all indexed keys.
+
+        Keys and their codes are accumulated in a plain dict first, then fed
+        to the automaton in a single add_word pass followed by one
+        make_automaton() call, avoiding per-key contains/get round-trips
+        into the C extension. When ahocorasick_rs is installed, its
+        SIMD-prefiltered matcher is additionally built for substring scans.
+        """
+        self._keyword_automaton = None
+        self._rs_automaton = None
+        self._rs_values: List[List[int]] = []
+
+        # Per-key postings grouped by source field, so prefix lookups can
+        # honor the requested search_type while substring/exact scans union
+        pending: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        for idx, name in enumerate(self._names_lc):
+            pending[name]["name"].append(idx)
+            pinyin = self._pinyins_lc[idx]
+            if pinyin:
+                pending[pinyin]["pinyin"].append(idx)
+            short = self._pinyin_shorts_lc[idx]
+            if short:
+                pending[short]["short"].append(idx)
+
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for key, groups in pending.items():
+                automaton.add_word(key, dict(groups))
+            automaton.make_automaton()
+            self._keyword_automaton = automaton
+
+        if ahocorasick_rs is not None and pending:
+            keys = list(pending.keys())
+            self._rs_values = [[idx for idxs in pending[k].values() for idx in idxs] for k in keys]
+            self._rs_automaton = ahocorasick_rs.AhoCorasick(keys)
+
+    def _substring_scan(self, query: str) -> Set[int]:
+        """Collect positions for every indexed key embedded in the query."""
+        results = set()
+        if self._rs_automaton is not None:
+            for pat_idx, _, _ in self._rs_automaton.find_matches_as_indexes(query):
+                results.update(self._rs_values[pat_idx])
+        elif self._keyword_automaton is not None:
+            for _, groups in self._keyword_automaton.iter(query):
+                for idxs in groups.values():
+                    results.update(idxs)
+        return results
+
+    def _build_fuzzy_arrays(self):
+        """Cache lowercase names/pinyins in parallel arrays for batch fuzzy scoring."""
+        self._fuzzy_names: List[str] = []
+        self._fuzzy_name_idxs: List[int] = []
+        self._fuzzy_pinyins: List[str] = []
+        self._fuzzy_pinyin_idxs: List[int] = []
+        self._fuzzy_name_masks: List[int] = []
+        self._fuzzy_pinyin_masks: List[int] = []
+        alphabet: Set[str] = set()
+        for region_idx, name in enumerate(self._names_lc):
+            self._fuzzy_names.append(name)
+            self._fuzzy_name_idxs.append(region_idx)
+            self._fuzzy_name_masks.append(_charmask(name))
+            alphabet.update(name)
+            pinyin = self._pinyins_lc[region_idx]
+            if pinyin:
+                self._fuzzy_pinyins.append(pinyin)
+                self._fuzzy_pinyin_idxs.append(region_idx)
+                self._fuzzy_pinyin_masks.append(_charmask(pinyin))
+                alphabet.update(pinyin)
+            alphabet.update(self._pinyin_shorts_lc[region_idx])
+        # Characters that appear anywhere in the index; queries sharing none
+        # of them cannot match and skip all search strategies.
+        self._alphabet = frozenset(alphabet)
+
+    def _get_region(self, code: str) -> Region:
+        """Memoized Region construction; dataclass field handling is not free
+        when repeated for every returned candidate of every query."""
+        region = self._region_cache.get(code)
+        if region is None:
+            region = Region(**self.index["code_to_region"][code])
+            self._region_cache[code] = region
+        return region
+
+    def _posting_idxs(self, posting) -> List[int]:
+        """Resolve a posting list to dense positions (legacy postings hold codes)."""
+        if self._int_postings:
+            return posting
+        code_to_index = self._code_to_index
+        return [code_to_index[c] for c in posting]
+
+    def _posting_codes(self, posting) -> List[str]:
+        """Resolve a posting list to region codes."""
+        index_to_code = self._index_to_code
+        return [index_to_code[i] for i in self._posting_idxs(posting)]
 
     def search(self, query: str, limit: int = 10, search_type: str = "all") -> List[SearchResult]:
         query = query.strip().lower()
         if not query:
             return []
 
-        candidates = self._parallel_search(query, search_type)
-        if not candidates:
+        # Clearly-unknown queries: no indexed character at all, nothing can match
+        if self._alphabet.isdisjoint(query):
             return []
 
-        scored_results = []
-        for code in candidates:
-            score = self._calculate_score(code, query)
-            region_dict = self.index["code_to_region"][code]
-            region = Region(**region_dict)
+        cache_key = (query, limit, search_type)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        candidates = self._parallel_search(query, search_type, limit)
+        if not candidates:
+            self._result_cache.put(cache_key, ())
+            return []
 
-            full_info = self._build_full_info(code)
-            scored_results.append(SearchResult(
-                region=region,
-                full_info=full_info,
+        if len(candidates) >= _VECTORIZE_MIN and _HAS_NP_STRINGS:
+            cand = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+            keep = self._prefilter_mask(cand, query)
+            if keep.any():
+                cand = cand[keep]
+            scores = self._score_batch(cand, query)
+            # Primary: score descending; tie-break: level rank ascending
+            order = np.lexsort((self._level_rank_by_idx[cand], -scores))[:limit]
+            top = []
+            for pos in order:
+                idx = int(cand[pos])
+                code = self._index_to_code[idx]
+                top.append(SearchResult(
+                    region=self._get_region(code),
+                    full_info=self._build_full_info(code),
+                    score=float(scores[pos]),
+                    match_type=self._get_match_type(idx, query)
+                ))
+            self._result_cache.put(cache_key, tuple(top))
+            return top
+
+        pool = [idx for idx in candidates if self._may_match(idx, query)]
+        if not pool:
+            pool = list(candidates)
+
+        # Score first as lightweight tuples; Region objects, full_info and
+        # match_type are materialized only for the top-limit survivors
+        scored = [(self._calculate_score(idx, query), -int(self._level_rank_by_idx[idx]), idx)
+                  for idx in pool]
+        scored.sort(reverse=True)
+
+        top = []
+        for score, _, idx in scored[:limit]:
+            code = self._index_to_code[idx]
+            top.append(SearchResult(
+                region=self._get_region(code),
+                full_info=self._build_full_info(code),
                 score=score,
-                match_type=self._get_match_type(code, query)
+                match_type=self._get_match_type(idx, query)
             ))
-
-        scored_results.sort(
-            key=lambda x: (x.score, -x.full_info["level_rank"]),
-            reverse=True
-        )
-
-        return scored_results[:limit]
-
-    def _parallel_search(self, query: str, search_type: str) -> Set[str]:
-        candidates = set()
-
-        # Strategy 1: Exact search
-        candidates.update(self._exact_search(query, search_type))
-
-        # Strategy 2: Prefix search (Trie)
+        self._result_cache.put(cache_key, tuple(top))
+        return top
+
+    def _parallel_search(self, query: str, search_type: str, limit: int = 10) -> Set[int]:
+        """Staged query plan, cheapest and most selective strategies first.
+
+        Each stage runs only while the candidate pool is still too small to
+        satisfy the limit with headroom for scoring to reorder; selective
+        queries never pay for the noisy n-gram and fuzzy expansions.
+        """
+        enough = max(20, limit * 2)
+
+        # Stage 1: Exact search - highest quality, near-free
+        candidates = set(self._exact_search(query, search_type))
+        if len(candidates) >= enough:
+            return candidates
+
+        # Stage 2: Automaton scan for embedded names, then prefix search (Trie)
+        if len(query) >= 2:
+            candidates.update(self._substring_scan(query))
         candidates.update(self._prefix_search(query, search_type))
+        if len(candidates) >= enough:
+            return candidates
 
-        # Strategy 3: N-gram search
-        candidates.update(self._ngram_search(query, search_type))
+        # Stage 3: N-gram search; 3-grams are far more selective than 2-grams,
+        # so the noisy 2-gram postings are consulted only when still starved
+        trigram_hits = self._ngram_search(query, search_type, ns=(3,))
+        candidates.update(trigram_hits)
+        if len(trigram_hits) < limit:
+            candidates.update(self._ngram_search(query, search_type, ns=(2,)))
 
-        # Strategy 4: Fuzzy search (Levenshtein) - only if few candidates
+        # Stage 4: Fuzzy search (Levenshtein) - only if few candidates
         if len(candidates) < 20:
             candidates.update(self._fuzzy_search(query, search_type))
 
         return candidates
 
-    def _exact_search(self, query: str, search_type: str) -> Set[str]:
+    def _exact_search(self, query: str, search_type: str) -> Set[int]:
         results = set()
+        if search_type == "all" and self._keyword_automaton is not None:
+            groups = self._keyword_automaton.get(query, None)
+            if groups:
+                for idxs in groups.values():
+                    results.update(idxs)
+
+        # Full lowercase names and cleaned pinyins are inverted-index keys
+        # themselves, so exact matches are plain dict hits - no full scans
         if search_type in ["all", "name"]:
             if query in self.index["name_inverted"]:
-                results.update(self.index["name_inverted"][query])
-            # Fallback for full name exact match not in inverted index chars
-            for code, region in self.index["code_to_region"].items():
-                if query == region["name"].lower():
-                    results.add(code)
+                results.update(self._posting_idxs(self.index["name_inverted"][query]))
 
         if search_type in ["all", "pinyin"]:
             if query in self.index["pinyin_inverted"]:
-                results.update(self.index["pinyin_inverted"][query])
-            for code, region in self.index["code_to_region"].items():
-                if region.get("pinyin") and query == region["pinyin"].lower().replace(" ", ""):
-                    results.add(code)
+                results.update(self._posting_idxs(self.index["pinyin_inverted"][query]))
 
         if search_type in ["all", "short"]:
             if query in self.index["short_inverted"]:
-                results.update(self.index["short_inverted"][query])
+                results.update(self._posting_idxs(self.index["short_inverted"][query]))
 
         return results
 
-    def _prefix_search(self, query: str, search_type: str) -> Set[str]:
+    def _prefix_search(self, query: str, search_type: str) -> Set[int]:
         results = set()
+        code_to_index = self._code_to_index
+
+        if self._keyword_automaton is not None:
+            # All indexed keys live in the automaton; one C-side prefix walk
+            # replaces the per-trie Python DFS. Newer index files no longer
+            # ship tries at all.
+            wanted = [t for t in ("name", "pinyin", "short") if search_type in ("all", t)]
+            for key in self._keyword_automaton.keys(query, "\x00", ahocorasick.MATCH_AT_LEAST_PREFIX):
+                groups = self._keyword_automaton.get(key)
+                for field in wanted:
+                    idxs = groups.get(field)
+                    if idxs:
+                        results.update(idxs)
+            return results
+
+        def search_csr_trie(trie: Dict, prefix: str) -> Set[int]:
+            # Flat SoA layout: postings at a node already cover its subtree.
+            chars = trie["char"]
+            first_child = trie["first_child"]
+            next_sibling = trie["next_sibling"]
+            node = 0
+            for char in prefix:
+                cp = ord(char)
+                child = first_child[node]
+                while child != -1 and chars[child] != cp:
+                    child = next_sibling[child]
+                if child == -1:
+                    return set()
+                node = child
+            row_ptr = trie["row_ptr"]
+            return {code_to_index[c] for c in trie["codes"][row_ptr[node]:row_ptr[node + 1]]}
+
+        def search_trie(trie: Dict, prefix: str) -> Set[int]:
+            if trie.get("format") == "csr":
+                return search_csr_trie(trie, prefix)
 
-        def search_trie(trie: Dict, prefix: str) -> Set[str]:
+            # Legacy nested-dict layout (pre-CSR index files)
             node = trie
             for char in prefix:
                 if char not in node:
@@ -121,190 +518,266 @@ class FuzzySearchAlgorithm:
                 for key, child in current.items():
                     if key not in ["codes", "$"]:
                         stack.append(child)
-            return codes
+            return {code_to_index[c] for c in codes}
 
-        if search_type in ["all", "name"]:
+        # Legacy index files (pre-automaton) still carry serialized tries
+        if search_type in ["all", "name"] and self.index.get("name_trie"):
             results.update(search_trie(self.index["name_trie"], query))
-        if search_type in ["all", "pinyin"]:
+        if search_type in ["all", "pinyin"] and self.index.get("pinyin_trie"):
             results.update(search_trie(self.index["pinyin_trie"], query))
-        if search_type in ["all", "short"]:
+        if search_type in ["all", "short"] and self.index.get("short_trie"):
             results.update(search_trie(self.index["short_trie"], query))
 
         return results
 
-    def _ngram_search(self, query: str, search_type: str) -> Set[str]:
-        results = set()
+    def _ngram_search(self, query: str, search_type: str, ns=(2, 3)) -> Set[int]:
+        maps = []
+        if search_type in ["all", "name"]:
+            maps.append(self.index["name_ngrams"])
+        if search_type in ["all", "pinyin"]:
+            maps.append(self.index["pinyin_ngrams"])
+
         ngram_sets = {}
-        for n in [2, 3]:
+        for n in ns:
             ngrams = {query[i:i + n] for i in range(len(query) - n + 1)}
+            if self._packed_ngrams:
+                ngrams = {pack_ngram(g) for g in ngrams}
             ngram_sets[n] = ngrams
 
-        if search_type in ["all", "name"]:
-            for ngrams in ngram_sets.values():
+        if self._int_postings:
+            # Postings are sorted int32 arrays: union them with one
+            # concatenate + unique in C instead of per-element set inserts
+            arrays = [posting
+                      for ngrams in ngram_sets.values()
+                      for ngram_map in maps
+                      for posting in (ngram_map.get(g) for g in ngrams)
+                      if posting is not None]
+            if not arrays:
+                return set()
+            return set(np.unique(np.concatenate(arrays)).tolist())
+
+        # Legacy indices store code strings per n-gram
+        results = set()
+        for ngrams in ngram_sets.values():
+            for ngram_map in maps:
                 for ngram in ngrams:
-                    if ngram in self.index["name_ngrams"]:
-                        results.update(self.index["name_ngrams"][ngram])
+                    if ngram in ngram_map:
+                        results.update(self._posting_idxs(ngram_map[ngram]))
+        return results
+
+    def _fuzzy_search(self, query: str, search_type: str) -> Set[int]:
+        if "name_del_index" in self.index:
+            return self._fuzzy_search_symspell(query, search_type)
+        if _rf_process is not None:
+            return self._fuzzy_search_rapidfuzz(query, search_type)
+        return self._fuzzy_search_fallback(query, search_type)
+
+    def _fuzzy_search_symspell(self, query: str, search_type: str) -> Set[int]:
+        """Symmetric-delete lookup: expand the query's deletion variants and
+        intersect with the precomputed index, so candidate generation is a
+        handful of dict hits instead of a scan; survivors are verified with a
+        real (bounded) edit-distance check to drop delete-only collisions."""
+        max_distance = self.config["max_edit_distance"]
+        variants = deletion_variants(query, max_distance)
+        results = set()
+
+        if search_type in ["all", "name"]:
+            candidates: Set[int] = set()
+            del_index = self.index["name_del_index"]
+            for variant in variants:
+                posting = del_index.get(variant)
+                if posting is not None:
+                    candidates.update(self._posting_idxs(posting))
+            for idx in candidates:
+                if _edit_distance(query, self._names_lc[idx], max_distance) <= max_distance:
+                    results.add(idx)
 
         if search_type in ["all", "pinyin"]:
-            for ngrams in ngram_sets.values():
-                for ngram in ngrams:
-                    if ngram in self.index["pinyin_ngrams"]:
-                        results.update(self.index["pinyin_ngrams"][ngram])
+            candidates = set()
+            del_index = self.index["pinyin_del_index"]
+            for variant in variants:
+                posting = del_index.get(variant)
+                if posting is not None:
+                    candidates.update(self._posting_idxs(posting))
+            for idx in candidates:
+                pinyin = self._pinyins_lc[idx]
+                if pinyin and _edit_distance(query, pinyin, max_distance) <= max_distance:
+                    results.add(idx)
+
         return results
 
-    def _fuzzy_search(self, query: str, search_type: str) -> Set[str]:
+    def _fuzzy_search_rapidfuzz(self, query: str, search_type: str) -> Set[int]:
+        """Batch fuzzy matching: one C call over all candidates instead of a Python loop."""
         results = set()
-        max_distance = self.config["max_edit_distance"]
-        for code, region in self.index["code_to_region"].items():
-            if search_type in ["all", "name"]:
-                name = region["name"].lower()
-                if self._levenshtein_distance(query, name[:len(query) + max_distance]) <= max_distance:
-                    results.add(code)
-            if search_type in ["all", "pinyin"] and region.get("pinyin"):
-                pinyin = region["pinyin"].lower().replace(" ", "")
-                if self._levenshtein_distance(query, pinyin[:len(query) + max_distance]) <= max_distance:
-                    results.add(code)
+        cutoff = self.config["fuzzy_threshold"] * 100
+
+        if search_type in ["all", "name"]:
+            for _, _, idx in _rf_process.extract(
+                    query, self._fuzzy_names,
+                    scorer=_rf_fuzz.ratio, score_cutoff=cutoff, limit=None):
+                results.add(self._fuzzy_name_idxs[idx])
+
+        if search_type in ["all", "pinyin"]:
+            for _, _, idx in _rf_process.extract(
+                    query, self._fuzzy_pinyins,
+                    scorer=_rf_fuzz.ratio, score_cutoff=cutoff, limit=None):
+                results.add(self._fuzzy_pinyin_idxs[idx])
+
         return results
 
-    def _levenshtein_distance(self, s1: str, s2: str) -> int:
-        if len(s1) < len(s2): return self._levenshtein_distance(s2, s1)
-        if len(s2) == 0: return len(s1)
-        previous_row = range(len(s2) + 1)
-        for i, c1 in enumerate(s1):
-            current_row = [i + 1]
-            for j, c2 in enumerate(s2):
-                insertions = previous_row[j + 1] + 1
-                deletions = current_row[j] + 1
-                substitutions = previous_row[j] + (c1 != c2)
-                current_row.append(min(insertions, deletions, substitutions))
-            previous_row = current_row
-        return previous_row[-1]
-
-    def _calculate_score(self, code: str, query: str) -> float:
-        region = self.index["code_to_region"][code]
-        score = 0.0
+    def _fuzzy_search_fallback(self, query: str, search_type: str) -> Set[int]:
+        results = set()
+        max_distance = self.config["max_edit_distance"]
+        qmask = _charmask(query)
+        # Require enough character/2-gram overlap before paying for the full DP
+        min_overlap = max(1, int(self.config["fuzzy_threshold"] * qmask.bit_count()) - max_distance * 2)
+        if search_type in ["all", "name"]:
+            for idx, name in enumerate(self._fuzzy_names):
+                if (qmask & self._fuzzy_name_masks[idx]).bit_count() < min_overlap:
+                    continue
+                if _edit_distance(query, name[:len(query) + max_distance], max_distance) <= max_distance:
+                    results.add(self._fuzzy_name_idxs[idx])
+        if search_type in ["all", "pinyin"]:
+            for idx, pinyin in enumerate(self._fuzzy_pinyins):
+                if (qmask & self._fuzzy_pinyin_masks[idx]).bit_count() < min_overlap:
+                    continue
+                if _edit_distance(query, pinyin[:len(query) + max_distance], max_distance) <= max_distance:
+                    results.add(self._fuzzy_pinyin_idxs[idx])
+        return results
 
-        # 1. Basic match score
-        score += self._calculate_basic_match_score(region, query)
+    def _may_match(self, idx: int, query: str) -> bool:
+        """Cheap containment test: candidates with no textual overlap at all
+        (stray n-gram or fuzzy hits) score near zero anyway, so skip them."""
+        name = self._names_lc[idx]
+        if query in name or name in query or self._short_names_lc[idx] in query:
+            return True
+        pinyin = self._pinyins_lc[idx]
+        if pinyin and (query in pinyin or pinyin in query):
+            return True
+        ver = self._pinyin_short_vers_lc[idx]
+        if ver and ver in query:
+            return True
+        short = self._pinyin_shorts_lc[idx]
+        return bool(short) and short.startswith(query)
+
+    def _prefilter_mask(self, cand: "np.ndarray", query: str) -> "np.ndarray":
+        """Vectorized _may_match over a candidate index array."""
+        q = query
+        names = self._names_arr[cand]
+        pins = self._pinyins_arr[cand]
+        vers = self._pinyin_short_vers_arr[cand]
+        shorts = self._pinyin_shorts_arr[cand]
+        return ((np.strings.find(names, q) >= 0)
+                | (np.strings.find(q, names) >= 0)
+                | (np.strings.find(q, self._short_names_arr[cand]) >= 0)
+                | ((pins != "") & ((np.strings.find(pins, q) >= 0) | (np.strings.find(q, pins) >= 0)))
+                | ((vers != "") & (np.strings.find(q, vers) >= 0))
+                | np.strings.startswith(shorts, q))
+
+    def _score_batch(self, cand: "np.ndarray", query: str) -> "np.ndarray":
+        """Vectorized _calculate_score over a candidate index array.
+
+        One np.strings dispatch per scoring column instead of a Python loop
+        per candidate; mirrors the scalar scoring rules exactly (same
+        branches, same constants) so both paths rank identically.
+        """
+        q = query
+        names = self._names_arr[cand]
+        shorts = self._short_names_arr[cand]
+
+        # 1. Basic match score: names
+        score = np.select(
+            [(names == q) | (shorts == q),
+             np.strings.startswith(names, q) | np.strings.startswith(shorts, q),
+             (np.strings.find(names, q) >= 0) | (np.strings.find(shorts, q) >= 0),
+             (np.strings.find(q, names) >= 0) | (np.strings.find(q, shorts) >= 0)],
+            [self.config["boost_exact_match"],
+             self.config["boost_prefix_match"], 0.5, 0.4], 0.0)
+
+        # 1b. Basic match score: pinyin variants
+        pins = self._pinyins_arr[cand]
+        pin_vers = self._pinyin_short_vers_arr[cand]
+        pin_score = np.select(
+            [(pins == q) | (pin_vers == q),
+             np.strings.startswith(pins, q) | np.strings.startswith(pin_vers, q),
+             (np.strings.find(pins, q) >= 0) | (np.strings.find(pin_vers, q) >= 0),
+             (np.strings.find(q, pins) >= 0) | (np.strings.find(q, pin_vers) >= 0)],
+            [self.config["boost_exact_match"] * 0.8,
+             self.config["boost_prefix_match"] * 0.6, 0.4, 0.3], 0.0)
+        score += pin_score * (pins != "")
+
+        py_shorts = self._pinyin_shorts_arr[cand]
+        score += np.select(
+            [py_shorts == q, np.strings.startswith(py_shorts, q)], [1.0, 0.8], 0.0)
 
         # 2. Position weight
-        score += self._calculate_position_score(region, query)
+        pos = np.strings.find(names, q)
+        qpos = np.strings.find(q, names)
+        score += np.where(
+            pos >= 0,
+            np.maximum(0.0, 1.0 - pos / np.strings.str_len(names)),
+            np.where(qpos >= 0, np.maximum(0.0, 1.0 - qpos / len(q)), 0.0))
 
         # 3. Level weight
-        level_weight = self.config["level_weights"].get(region["level"], 0.5)
-        score *= level_weight
-
-        # 4. Full path reward (more lenient)
-        if region.get("full_path"):
-            full_path = region["full_path"].lower()
-            clean_path = full_path.replace(">", "")
-            if query in full_path or query in clean_path:
-                path_factor = len(full_path.split(">")) / 3.0
-                score += 0.5 * path_factor  # Increased reward
-            else:
-                # Check if parts of query are in path
-                parts_found = 0
-                for part in re.findall(r"[\u4e00-\u9fff]+|[a-z]+", query):
-                    if part in full_path:
-                        parts_found += 1
-                if parts_found > 0:
-                    score += 0.2 * parts_found
+        score *= self._level_weight_by_idx[cand]
+
+        # 4. Full path reward
+        paths = self._full_paths_arr[cand]
+        hit = (np.strings.find(paths, q) >= 0) | (np.strings.find(self._clean_paths_arr[cand], q) >= 0)
+        path_score = np.where(hit, 0.5 * (np.strings.count(paths, ">") + 1) / 3.0, 0.0)
+        parts = _PART_RE.findall(q)
+        if parts:
+            parts_found = np.zeros(len(cand))
+            for part in parts:
+                parts_found += np.strings.find(paths, part) >= 0
+            path_score = np.where(hit, path_score, 0.2 * parts_found)
+        score += path_score
 
         # 5. Pinyin similarity
-        if query.isalpha():
-            if region.get("pinyin"):
-                pinyin = region["pinyin"].lower().replace(" ", "")
-                similarity = SequenceMatcher(None, query, pinyin).ratio()
-                score += similarity * 0.3
-
-        return min(1.0, score)
-
-    def _calculate_basic_match_score(self, region: Dict, query: str) -> float:
-        score = 0.0
-        name = region["name"].lower()
-
-        # Strip common suffixes for more flexible matching
-        short_name = name
-        for s in COMMON_SUFFIXES:
-            if short_name.endswith(s):
-                short_name = short_name[:-len(s)]
-                break
-
-        if query == name or query == short_name:
-            score += self.config["boost_exact_match"]
-        elif name.startswith(query) or short_name.startswith(query):
-            score += self.config["boost_prefix_match"]
-        elif query in name or query in short_name:
-            score += 0.5
-        elif name in query or short_name in query:
-            score += 0.4
-
-        if region.get("pinyin"):
-            pinyin = region["pinyin"].lower().replace(" ", "")
-            pinyin_short_ver = pinyin
-            if pinyin.endswith("sheng"):
-                pinyin_short_ver = pinyin[:-5]
-            elif pinyin.endswith("shi"):
-                pinyin_short_ver = pinyin[:-3]
-
-            if query == pinyin or query == pinyin_short_ver:
-                score += self.config["boost_exact_match"] * 0.8
-            elif pinyin.startswith(query) or pinyin_short_ver.startswith(query):
-                score += self.config["boost_prefix_match"] * 0.6
-            elif query in pinyin or query in pinyin_short_ver:
-                score += 0.4
-            elif pinyin in query or pinyin_short_ver in query:
-                score += 0.3
-
-        if region.get("pinyin_short"):
-            short = region["pinyin_short"].lower()
-            if query == short:
-                score += 1.0
-            elif short.startswith(query):
-                score += 0.8
-        return score
-
-    def _calculate_position_score(self, region: Dict, query: str) -> float:
-        name = region["name"].lower()
-        # Find match for any part of name in query or vice versa
-        pos = name.find(query)
-        if pos == -1:
-            # Check if name is in query
-            pos = query.find(name)
-            if pos == -1: return 0.0
-            return max(0.0, 1.0 - pos / len(query))
-
-        return max(0.0, 1.0 - pos / len(name))
-
-    def _get_match_type(self, code: str, query: str) -> str:
-        region = self.index["code_to_region"][code]
-        name = region["name"].lower()
+        if q.isalpha():
+            if _rf_process is not None:
+                sims = _rf_process.cdist([q], pins.tolist(), scorer=_rf_fuzz.ratio)[0] / 100.0
+            elif Levenshtein is not None:
+                sims = np.asarray([Levenshtein.ratio(q, p) if p else 0.0 for p in pins.tolist()])
+            else:
+                sims = np.asarray(
+                    [SequenceMatcher(None, q, p).ratio() if p else 0.0 for p in pins.tolist()])
+            score += sims * 0.3
+
+        return np.minimum(1.0, score)
+
+    def _calculate_score(self, idx: int, query: str) -> float:
+        return _score_candidate(
+            query,
+            self._names_lc[idx],
+            self._short_names_lc[idx],
+            self._pinyins_lc[idx],
+            self._pinyin_short_vers_lc[idx],
+            self._pinyin_shorts_lc[idx],
+            self._full_paths_lc[idx],
+            self._clean_paths_lc[idx],
+            float(self._level_weight_by_idx[idx]),
+            self.config["boost_exact_match"],
+            self.config["boost_prefix_match"],
+        )
 
-        short_name = name
-        for s in COMMON_SUFFIXES:
-            if short_name.endswith(s):
-                short_name = short_name[:-len(s)]
-                break
+    def _get_match_type(self, idx: int, query: str) -> str:
+        name = self._names_lc[idx]
+        short_name = self._short_names_lc[idx]
 
         if query == name or query == short_name: return "exact_name"
         if name.startswith(query) or short_name.startswith(query): return "prefix_name"
         if name in query or short_name in query: return "part_name"
 
-        if region.get("pinyin"):
-            pinyin = region["pinyin"].lower().replace(" ", "")
-            pinyin_short_ver = pinyin
-            if pinyin.endswith("sheng"):
-                pinyin_short_ver = pinyin[:-5]
-            elif pinyin.endswith("shi"):
-                pinyin_short_ver = pinyin[:-3]
-
+        pinyin = self._pinyins_lc[idx]
+        if pinyin:
+            pinyin_short_ver = self._pinyin_short_vers_lc[idx]
             if query == pinyin or query == pinyin_short_ver: return "exact_pinyin"
             if pinyin.startswith(query) or pinyin_short_ver.startswith(query): return "prefix_pinyin"
             if pinyin in query or pinyin_short_ver in query: return "part_pinyin"
 
-        if region.get("pinyin_short"):
-            short = region["pinyin_short"].lower()
-            if query == short: return "exact_short"
+        short = self._pinyin_shorts_lc[idx]
+        if query and query == short: return "exact_short"
         return "fuzzy"
 
     def _build_full_info(self, code: str) -> Dict:
@@ -321,7 +794,7 @@ class FuzzySearchAlgorithm:
             elif "区县级" in level:
                 hierarchy["district"] = anc
 
-        level_rank = {"省级": 1, "市级": 2, "区县级": 3, "街道级": 4, "村级": 5}.get(region["level"], 99)
+        level_rank = LEVEL_RANKS.get(region["level"], 99)
         display_path = " > ".join([self.index["code_to_region"][c]["name"] for c in ancestors])
 
         return {
@@ -339,6 +812,9 @@ class RegionSearchEngine:
     def __init__(self, index_file: Optional[Union[str, Path]] = None):
         self.index = None
         self.search_algorithm = None
+        # Engine-level cache: unlike the algorithm's, it also covers
+        # search-type detection and the pinyin-combo path
+        self._result_cache = LRUCache(maxsize=1024)
         self._init_common_patterns()
 
         if index_file:
@@ -348,22 +824,32 @@ class RegionSearchEngine:
         """Load index from binary file."""
         self.index = StorageManager.load(str(filepath))
         self.search_algorithm = FuzzySearchAlgorithm(self.index)
+        self._result_cache.clear()
 
     def search(self, query: str, limit: int = 10, search_type: str = "auto") -> List[SearchResult]:
         if not self.index:
             raise RuntimeError("Index not loaded. Use load_index() first.")
 
+        cache_key = (query.strip().lower(), limit, search_type)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
         if search_type == "auto":
             search_type = self._detect_search_type(query)
 
+        results = None
         if search_type == "pinyin_combo":
             results = self._search_pinyin_combo(query, limit)
-            if results:
-                return results
-            # Fallback to normal pinyin search if combo fails
-            search_type = "pinyin"
-
-        return self.search_algorithm.search(query, limit, search_type)
+            if not results:
+                # Fallback to normal pinyin search if combo fails
+                search_type = "pinyin"
+                results = None
+        if not results:
+            results = self.search_algorithm.search(query, limit, search_type)
+
+        self._result_cache.put(cache_key, tuple(results))
+        return results
 
     def _detect_search_type(self, query: str) -> str:
         query = query.strip()
@@ -372,8 +858,8 @@ class RegionSearchEngine:
         q_lower = query.lower()
 
         # 1. Contains Chinese
-        if any("\u4e00" <= c <= "\u9fff" for c in query):
-            if any("a" <= c <= "z" for c in q_lower): return "mixed"
+        if _HAN_RE.search(query):
+            if _ASCII_ALPHA_RE.search(q_lower): return "mixed"
             return "name"
 
         # 2. Pure letters
@@ -407,13 +893,12 @@ class RegionSearchEngine:
         return True
 
     def _could_be_combo(self, text: str) -> bool:
-        for p in self.common_province_pinyin:
-            if text.startswith(p) or (len(p) >= 4 and text.startswith(p[:4])):
-                return True
-        if len(text) in [4, 5, 6]:
-            for split in [2, 3]:
-                if split < len(text) and text[:split] in self.common_province_shorts:
-                    return True
+        # Every province pinyin is at least 4 chars, so "starts with a
+        # province pinyin or its 4-char stem" collapses to one membership test
+        if text[:4] in self.combo_pinyin_prefixes:
+            return True
+        if len(text) in (4, 5, 6):
+            return text[:2] in self.common_province_shorts or text[:3] in self.common_province_shorts
         return False
 
     def _init_common_patterns(self):
@@ -429,6 +914,7 @@ class RegionSearchEngine:
             "jx", "sd", "ha", "hb", "hn", "gd", "hi", "sc", "gz", "yn", "sn", "gs", "qh",
             "nx", "xj", "tw", "hk", "mo", "gx", "nm", "xz"
         }
+        self.combo_pinyin_prefixes = {p[:4] for p in self.common_province_pinyin}
 
     def _search_pinyin_combo(self, query: str, limit: int = 10) -> List[SearchResult]:
         query = query.strip().lower()
@@ -462,11 +948,15 @@ class RegionSearchEngine:
         return combos
 
     def _find_by_short(self, short: str, level: str) -> List[Dict]:
-        matches = []
-        for code, reg in self.index["code_to_region"].items():
-            if reg["level"] == level and reg.get("pinyin_short") == short:
-                matches.append(reg)
-        return matches
+        index = self.index.get("short_level_index")
+        if index is None:
+            # Derived once for index files that predate the precomputed map
+            index = defaultdict(list)
+            for reg in self.index["code_to_region"].values():
+                if reg.get("pinyin_short"):
+                    index[(reg["level"], reg["pinyin_short"])].append(reg)
+            self.index["short_level_index"] = index = dict(index)
+        return index.get((level, short), [])
 
     def _execute_combo_search(self, combo: Dict, query: str) -> List[SearchResult]:
         results = []
@@ -476,7 +966,7 @@ class RegionSearchEngine:
         # City result
         full_info = self.search_algorithm._build_full_info(c_reg["code"])
         results.append(SearchResult(
-            region=Region(**c_reg),
+            region=self.search_algorithm._get_region(c_reg["code"]),
             full_info=full_info,
             score=combo["score"],
             match_type="combo_primary"
@@ -484,10 +974,10 @@ class RegionSearchEngine:
 
         # Districts under this city
         if c_reg["code"] in self.index["parent_inverted"]:
-            for d_code in self.index["parent_inverted"][c_reg["code"]]:
-                d_reg = self.index["code_to_region"][d_code]
+            children = self.search_algorithm._posting_codes(self.index["parent_inverted"][c_reg["code"]])
+            for d_code in children:
                 results.append(SearchResult(
-                    region=Region(**d_reg),
+                    region=self.search_algorithm._get_region(d_code),
                     full_info=self.search_algorithm._build_full_info(d_code),
                     score=combo["score"] * 0.7,
                     match_type="combo_district"
@@ -1,69 +1,264 @@
 import hashlib
+import io
 import logging
+import mmap
+import os
 import pickle
 import struct
 import zlib
 from typing import Any
 
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is a declared dependency
+    zstandard = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover - xxhash is a declared dependency
+    xxhash = None
+
 
 logger = logging.getLogger(__name__)
 
 
+# Hash algorithm tags stored in the file header (version 3+)
+_HASH_SHA256 = 0
+_HASH_BLAKE3 = 1
+_HASH_XXH3 = 2
+
+_HASH_NAMES = {_HASH_SHA256: "sha256", _HASH_BLAKE3: "blake3", _HASH_XXH3: "xxh3_128"}
+_HASH_SIZES = {_HASH_SHA256: 32, _HASH_BLAKE3: 32, _HASH_XXH3: 16}
+
+
+def _new_hasher(tag: int):
+    if tag == _HASH_XXH3:
+        if xxhash is None:
+            raise RuntimeError("file uses an xxh3 checksum but xxhash is not installed")
+        return xxhash.xxh3_128()
+    if tag == _HASH_BLAKE3:
+        if blake3 is None:
+            raise RuntimeError("file uses a blake3 checksum but blake3 is not installed")
+        return blake3.blake3()
+    return hashlib.sha256()
+
+
+def _default_hash() -> int:
+    if xxhash is not None:
+        return _HASH_XXH3
+    if blake3 is not None:
+        return _HASH_BLAKE3
+    return _HASH_SHA256
+
+
+class _HashingWriter(io.RawIOBase):
+    """File wrapper that hashes and counts every byte written through it."""
+
+    def __init__(self, fileobj, hasher):
+        self.fileobj = fileobj
+        self.hasher = hasher
+        self.bytes_written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.hasher.update(data)
+        self.bytes_written += len(data)
+        return self.fileobj.write(data)
+
+
+class _HashingReader(io.RawIOBase):
+    """Bounded file wrapper that hashes every byte read through it."""
+
+    def __init__(self, fileobj, hasher, limit: int):
+        self.fileobj = fileobj
+        self.hasher = hasher
+        self.remaining = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:self.remaining]
+        n = self.fileobj.readinto(view)
+        self.hasher.update(view[:n])
+        self.remaining -= n
+        return n
+
+    def drain(self):
+        """Consume (and hash) any bytes the unpickler did not read."""
+        while self.remaining > 0:
+            chunk = self.read(min(self.remaining, 1 << 20))
+            if not chunk:
+                break
+
+
 class StorageManager:
     """Handles saving and loading of the index with checksum and compression."""
     MAGIC = b"RIDX"
-    VERSION = 1
+    VERSION = 3
+    # Integrity (not security) check; xxh3 runs near memory bandwidth and
+    # BLAKE3 is SIMD-parallel - both far faster than SHA-256 on large blobs.
+    HASH = _default_hash()
 
     @classmethod
-    def save(cls, filepath: str, data: Any, compress: bool = True):
-        """Save data to a binary file with optional compression."""
-        try:
-            serialized_data = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    def save(cls, filepath: str, data: Any, compress: bool = True,
+             codec: str = None, level: int = 3):
+        """Save data to a binary file with optional compression.
 
+        The pickle stream is piped straight through the compressor and a
+        hashing writer into the file, so neither the serialized nor the
+        compressed blob is ever fully materialized in memory. The payload
+        length in the header is patched in after the stream is flushed.
+        The stream targets a temp file that replaces filepath only once it
+        is complete, so a failure mid-save never corrupts an existing index.
+
+        codec forces "zstd" or "zlib"; by default zstd is used when
+        installed. level is passed to the chosen compressor (zstd default 3
+        trades a few ratio points for much faster save/load).
+        """
+        tmp_path = f"{filepath}.tmp"
+        try:
             flags = 0
             if compress:
-                serialized_data = zlib.compress(serialized_data)
-                flags |= 1  # bit 0: compression enabled
-
-            checksum = hashlib.sha256(serialized_data).digest()
+                if codec == "zlib" or (codec is None and zstandard is None):
+                    flags |= 1
+                elif codec in (None, "zstd"):
+                    if zstandard is None:
+                        raise RuntimeError("zstd codec requested but zstandard is not installed")
+                    flags |= 2
+                else:
+                    raise ValueError(f"Unknown codec: {codec!r}")
 
-            with open(filepath, "wb") as f:
+            with open(tmp_path, "wb") as f:
                 f.write(cls.MAGIC)
                 f.write(struct.pack("B", cls.VERSION))
                 f.write(struct.pack("B", flags))
-                f.write(struct.pack("Q", len(serialized_data)))
-                f.write(serialized_data)
-                f.write(checksum)
+                f.write(struct.pack("B", cls.HASH))
+                length_offset = f.tell()
+                f.write(struct.pack("Q", 0))  # placeholder, patched below
+
+                writer = _HashingWriter(f, _new_hasher(cls.HASH))
+                if flags & 2:
+                    cctx = zstandard.ZstdCompressor(level=level, threads=-1)
+                    with cctx.stream_writer(writer, closefd=False) as cw:
+                        pickle.dump(data, cw, protocol=pickle.HIGHEST_PROTOCOL)
+                elif flags & 1:
+                    compressor = zlib.compressobj(level)
+                    payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+                    writer.write(compressor.compress(payload))
+                    writer.write(compressor.flush())
+                else:
+                    pickle.dump(data, writer, protocol=pickle.HIGHEST_PROTOCOL)
+
+                f.write(writer.hasher.digest())
+                f.seek(length_offset)
+                f.write(struct.pack("Q", writer.bytes_written))
+            os.replace(tmp_path, filepath)  # atomic within the same directory
             logger.debug(f"Successfully saved index to {filepath}")
         except Exception as e:
             logger.error(f"Failed to save index to {filepath}: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
             raise
 
     @classmethod
     def load(cls, filepath: str) -> Any:
-        """Load data from a binary file with checksum verification."""
+        """Load data from a binary file with checksum verification.
+
+        The file is memory-mapped so the compressed payload is paged in
+        lazily (and shared across processes); checksum verification and
+        decompression run over zero-copy views of the mapping. Files on
+        filesystems that refuse mmap fall back to streaming reads.
+        """
         try:
             with open(filepath, "rb") as f:
-                if f.read(4) != cls.MAGIC:
-                    raise ValueError(f"Invalid file format in {filepath}")
-
-                version = struct.unpack("B", f.read(1))[0]
-                flags = struct.unpack("B", f.read(1))[0]
-                data_len = struct.unpack("Q", f.read(8))[0]
-                data = f.read(data_len)
-                checksum = f.read(32)
-
-                if hashlib.sha256(data).digest() != checksum:
-                    raise ValueError(f"Checksum mismatch for {filepath}")
-
-                is_compressed = bool(flags & 1)
-                if is_compressed:
-                    data = zlib.decompress(data)
-
-                return pickle.loads(data)
+                try:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    return cls._load_stream(f, filepath)
+                with mm:
+                    return cls._load_mapped(mm, filepath)
         except FileNotFoundError:
             logger.error(f"Index file not found: {filepath}")
             raise
         except Exception as e:
             logger.error(f"Failed to load index from {filepath}: {e}")
             raise
+
+    @classmethod
+    def _load_mapped(cls, mm: "mmap.mmap", filepath: str) -> Any:
+        if mm[:4] != cls.MAGIC:
+            raise ValueError(f"Invalid file format in {filepath}")
+
+        version = mm[4]
+        flags = mm[5]
+        # Versions 1-2 always used SHA-256 and had no hash tag byte
+        if version >= 3:
+            hash_tag = mm[6]
+            length_offset = 7
+        else:
+            hash_tag = _HASH_SHA256
+            length_offset = 6
+        data_len = struct.unpack_from("Q", mm, length_offset)[0]
+        start = length_offset + 8
+
+        payload = memoryview(mm)[start:start + data_len]
+        try:
+            # Verify integrity before unpickling; one pass over the mapping
+            hasher = _new_hasher(hash_tag)
+            hasher.update(payload)
+            checksum = bytes(mm[start + data_len:start + data_len + _HASH_SIZES[hash_tag]])
+            if hasher.digest() != checksum:
+                raise ValueError(f"Checksum mismatch for {filepath}")
+
+            if flags & 2:  # zstd (version 2+)
+                if zstandard is None:
+                    raise RuntimeError(f"{filepath} is zstd-compressed but zstandard is not installed")
+                with zstandard.ZstdDecompressor().stream_reader(payload) as sr:
+                    return pickle.load(sr)
+            if flags & 1:  # zlib (version 1 files, or zstd unavailable at save time)
+                return pickle.loads(zlib.decompress(payload))
+            return pickle.loads(payload)
+        finally:
+            payload.release()
+
+    @classmethod
+    def _load_stream(cls, f, filepath: str) -> Any:
+        """Streaming fallback: decompression and checksumming share one pass."""
+        if f.read(4) != cls.MAGIC:
+            raise ValueError(f"Invalid file format in {filepath}")
+
+        version = struct.unpack("B", f.read(1))[0]
+        flags = struct.unpack("B", f.read(1))[0]
+        # Versions 1-2 always used SHA-256 and had no hash tag byte
+        hash_tag = struct.unpack("B", f.read(1))[0] if version >= 3 else _HASH_SHA256
+        data_len = struct.unpack("Q", f.read(8))[0]
+
+        reader = _HashingReader(f, _new_hasher(hash_tag), data_len)
+        if flags & 2:  # zstd (version 2+)
+            if zstandard is None:
+                raise RuntimeError(f"{filepath} is zstd-compressed but zstandard is not installed")
+            with zstandard.ZstdDecompressor().stream_reader(reader, closefd=False) as sr:
+                result = pickle.load(sr)
+        elif flags & 1:  # zlib (version 1 files, or zstd unavailable at save time)
+            result = pickle.loads(zlib.decompress(reader.read(data_len)))
+        else:
+            result = pickle.load(reader)
+
+        reader.drain()
+        checksum = f.read(_HASH_SIZES[hash_tag])
+        if reader.hasher.digest() != checksum:
+            raise ValueError(f"Checksum mismatch for {filepath}")
+
+        return result
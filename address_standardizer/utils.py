@@ -1,62 +1,156 @@
-import array
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+import numpy as np
+
+_HAS_BITWISE_COUNT = hasattr(np, "bitwise_count")
+
+
+COMMON_SUFFIXES = ["省", "市", "区", "县", "自治州", "自治区", "特别行政区"]
+
+
+def derive_text_fields(region: Dict) -> Dict[str, str]:
+    """Lowercase/stripped text variants consumed by the scoring hot path.
+
+    Shared by the builder (which persists them into the index) and the engine
+    (which derives them at load time for index files that predate them), so
+    both sides always agree on the stripping rules.
+    """
+    name_lc = region["name"].lower()
+    short_name_lc = name_lc
+    for suffix in COMMON_SUFFIXES:
+        if short_name_lc.endswith(suffix):
+            short_name_lc = short_name_lc[:-len(suffix)]
+            break
+
+    pinyin_lc = (region.get("pinyin") or "").lower().replace(" ", "")
+    pinyin_short_ver_lc = pinyin_lc
+    if pinyin_lc.endswith("sheng"):
+        pinyin_short_ver_lc = pinyin_lc[:-5]
+    elif pinyin_lc.endswith("shi"):
+        pinyin_short_ver_lc = pinyin_lc[:-3]
+
+    full_path_lc = (region.get("full_path") or "").lower()
+    return {
+        "name_lc": name_lc,
+        "short_name_lc": short_name_lc,
+        "pinyin_lc": pinyin_lc,
+        "pinyin_short_ver_lc": pinyin_short_ver_lc,
+        "pinyin_short_lc": (region.get("pinyin_short") or "").lower(),
+        "full_path_lc": full_path_lc,
+        "clean_path_lc": full_path_lc.replace(">", ""),
+    }
+
+
+def deletion_variants(text: str, max_deletes: int) -> set:
+    """All strings reachable from text by deleting up to max_deletes chars.
+
+    Shared by the builder (indexing side) and the engine (query side) of the
+    symmetric-delete fuzzy index; both must generate identical neighborhoods.
+    """
+    variants = {text}
+    frontier = {text}
+    for _ in range(max_deletes):
+        next_frontier = set()
+        for item in frontier:
+            for i in range(len(item)):
+                next_frontier.add(item[:i] + item[i + 1:])
+        variants |= next_frontier
+        frontier = next_frontier
+    return variants
+
+
+def pack_ngram(gram: str) -> int:
+    """Pack a short n-gram into an int key (21 bits per codepoint).
+
+    Packed keys are collision-free for n <= 3 and cheaper to hash and
+    pickle than the term strings themselves.
+    """
+    key = 0
+    for char in gram:
+        key = (key << 21) | ord(char)
+    return key
+
+
+class LRUCache:
+    """Small bounded LRU cache (most recently used entries kept)."""
+
+    _MISS = object()
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._data.pop(key, self._MISS)
+        if value is self._MISS:
+            return default
+        self._data[key] = value  # re-insert as most recent
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._data.pop(key, None)
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
 
 
 class BitmapIndex:
-    """Bitmap index for fast set operations."""
+    """Bitmap index for fast set operations, backed by uint64 numpy words."""
 
     def __init__(self, capacity: int):
         self.capacity = capacity
-        self.bitmap = array.array("Q")  # 64-bit integers
         self.word_count = (capacity + 63) // 64
-        self.bitmap.extend([0] * self.word_count)
+        self.bitmap = np.zeros(self.word_count, dtype=np.uint64)
+
+    @classmethod
+    def from_indices(cls, capacity: int, indices) -> "BitmapIndex":
+        """Build a bitmap from an iterable of indices in one vectorized pass."""
+        bitmap = cls(capacity)
+        idxs = np.fromiter(indices, dtype=np.int64)
+        if idxs.size:
+            np.bitwise_or.at(bitmap.bitmap, idxs >> 6,
+                             np.uint64(1) << (idxs & 63).astype(np.uint64))
+        return bitmap
+
+    def __setstate__(self, state):
+        # Older pickled indices stored the words in an array.array("Q")
+        bitmap = state.get("bitmap")
+        if bitmap is not None and not isinstance(bitmap, np.ndarray):
+            state = dict(state)
+            state["bitmap"] = np.frombuffer(bitmap.tobytes(), dtype=np.uint64).copy()
+        self.__dict__.update(state)
 
     def set(self, index: int):
         if 0 <= index < self.capacity:
-            word_idx = index // 64
-            bit_idx = index % 64
-            self.bitmap[word_idx] |= (1 << bit_idx)
+            self.bitmap[index >> 6] |= np.uint64(1 << (index & 63))
 
     def get(self, index: int) -> bool:
         if 0 <= index < self.capacity:
-            word_idx = index // 64
-            bit_idx = index % 64
-            return bool(self.bitmap[word_idx] & (1 << bit_idx))
+            return bool(self.bitmap[index >> 6] & np.uint64(1 << (index & 63)))
         return False
 
     def and_op(self, other: "BitmapIndex") -> "BitmapIndex":
         result = BitmapIndex(self.capacity)
-        for i in range(min(self.word_count, other.word_count)):
-            result.bitmap[i] = self.bitmap[i] & other.bitmap[i]
+        n = min(self.word_count, other.word_count)
+        result.bitmap[:n] = self.bitmap[:n] & other.bitmap[:n]
         return result
 
     def or_op(self, other: "BitmapIndex") -> "BitmapIndex":
         result = BitmapIndex(self.capacity)
-        for i in range(min(self.word_count, other.word_count)):
-            result.bitmap[i] = self.bitmap[i] | other.bitmap[i]
+        n = min(self.word_count, other.word_count)
+        result.bitmap[:n] = self.bitmap[:n] | other.bitmap[:n]
         return result
 
     def count(self) -> int:
-        count = 0
-        for word in self.bitmap:
-            n = word
-            while n:
-                n &= n - 1
-                count += 1
-        return count
-
-
-class CompressedString:
-    """Lightweight string storage optimization."""
-
-    def __init__(self, text: str):
-        self.original = text
-        self.compressed = self._compress(text)
-
-    def _compress(self, text: str) -> bytes:
-        if all(ord(c) < 128 for c in text):
-            return text.encode("ascii")
-        return text.encode("utf-8")
-
-    @property
-    def value(self) -> str:
-        return self.original
+        # np.bitwise_count needs NumPy >= 2.0; popcount via unpackbits on
+        # older installs, which are the ones most likely to hold old indices
+        if _HAS_BITWISE_COUNT:
+            return int(np.bitwise_count(self.bitmap).sum())
+        return int(np.unpackbits(self.bitmap.view(np.uint8)).sum())